@@ -0,0 +1,109 @@
+"""Mesure le coût d'import de chaque module au démarrage de l'application.
+
+Chaque module est importé dans un interpréteur neuf (``python -X importtime``)
+afin que les caches de ``sys.modules`` ne faussent pas les mesures.
+
+Utilisation :
+    python bench_startup.py
+    python bench_startup.py --repeat 5 invoice_processor pdf_generator
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Modules de l'application puis dépendances lourdes, dans l'ordre d'affichage
+DEFAULT_MODULES = [
+    'main',
+    'models',
+    'utils',
+    'invoice_processor',
+    'pdf_generator',
+    'streamlit',
+    'pandas',
+    'openpyxl',
+    'reportlab.platypus',
+]
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Extrait (self, cumulé) en microsecondes pour chaque module de la sortie -X importtime"""
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            # Ligne d'en-tête
+            continue
+        timings[parts[2].strip()] = (self_us, cumulative_us)
+    return timings
+
+
+def measure_import(module: str) -> Tuple[Optional[float], Dict[str, Tuple[int, int]], str]:
+    """Importe un module dans un sous-processus et retourne son temps cumulé (ms)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    timings = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'erreur inconnue'
+        return None, timings, error
+    if module not in timings:
+        return None, timings, 'module absent de la sortie importtime'
+    return timings[module][1] / 1000, timings, ''
+
+
+def heavy_dependencies(timings: Dict[str, Tuple[int, int]]) -> List[str]:
+    """Liste les dépendances lourdes chargées en même temps que le module"""
+    heavy = ['streamlit', 'pandas', 'openpyxl', 'reportlab']
+    return [name for name in heavy if name in timings]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import par module")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES,
+                        help="Modules à mesurer (par défaut : modules de l'application et dépendances lourdes)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Nombre de mesures par module (la médiane est affichée)')
+    args = parser.parse_args(argv)
+
+    print(f"{'Module':<22}{'Médiane (ms)':>14}{'Min (ms)':>12}  Dépendances lourdes chargées")
+    print('-' * 80)
+
+    failures = 0
+    for module in args.modules:
+        samples = []
+        timings: Dict[str, Tuple[int, int]] = {}
+        error = ''
+        for _ in range(max(args.repeat, 1)):
+            elapsed, timings, error = measure_import(module)
+            if elapsed is None:
+                break
+            samples.append(elapsed)
+
+        if not samples:
+            failures += 1
+            print(f"{module:<22}{'—':>14}{'—':>12}  échec : {error}")
+            continue
+
+        loaded = ', '.join(dep for dep in heavy_dependencies(timings) if not module.startswith(dep)) or '-'
+        print(f"{module:<22}{statistics.median(samples):>14.1f}{min(samples):>12.1f}  {loaded}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
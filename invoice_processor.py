@@ -1,8 +1,9 @@
-import pandas as pd
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Tuple
-from models import Invoice, Client
-import streamlit as st
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from models import Invoice, Client, ContractSubtotal
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class InvoiceProcessor:
     """Traite les factures Excel et les regroupe par client"""
@@ -13,8 +14,10 @@ class InvoiceProcessor:
             'montant_ht', 'montant_tva'
         ]
     
-    def validate_excel_structure(self, df: pd.DataFrame) -> Tuple[bool, str]:
+    def validate_excel_structure(self, df: "pd.DataFrame") -> Tuple[bool, str]:
         """Valide la structure du fichier Excel"""
+        import pandas as pd
+        
         try:
             # Vérifier les colonnes requises
             missing_columns = [col for col in self.required_columns if col not in df.columns]
@@ -40,6 +43,8 @@ class InvoiceProcessor:
     
     def clean_decimal(self, value) -> Decimal:
         """Nettoie et convertit une valeur en Decimal"""
+        import pandas as pd
+        
         if pd.isna(value):
             return Decimal('0.00')
         
@@ -56,6 +61,9 @@ class InvoiceProcessor:
     
     def process_excel_file(self, uploaded_file) -> Tuple[bool, List[Client], str]:
         """Traite le fichier Excel et retourne les clients groupés"""
+        # Import différé : pandas/openpyxl ne sont chargés qu'au premier upload
+        import pandas as pd
+        
         try:
             # Lire le fichier Excel
             df = pd.read_excel(uploaded_file, engine='openpyxl')
@@ -95,16 +103,49 @@ class InvoiceProcessor:
                 )
                 invoices.append(invoice)
             
+            # Sous-totaux par client et par contrat (un seul groupby)
+            contract_subtotals = self.compute_contract_subtotals(df)
+            
             # Grouper par client
-            clients = self.group_by_client(invoices)
+            clients = self.group_by_client(invoices, contract_subtotals)
             
             return True, clients, f"Traitement réussi : {len(clients)} clients trouvés"
         
         except Exception as e:
             return False, [], f"Erreur lors du traitement : {str(e)}"
     
-    def group_by_client(self, invoices: List[Invoice]) -> List[Client]:
-        """Groupe les factures par client"""
+    def compute_contract_subtotals(self, df: "pd.DataFrame") -> Dict[str, List[ContractSubtotal]]:
+        """Calcule les sous-totaux par client et par contrat en un seul passage groupby"""
+        client_keys = df['Numéro_client'].str.lower().str.strip()
+        grouped = df.groupby([client_keys, df['Numéro_contrat']], sort=True).agg(
+            invoice_count=('Numéro_facture', 'size'),
+            total_ht=('montant_ht', 'sum'),
+            total_tva=('montant_tva', 'sum'),
+            total_ttc=('montant_ttc', 'sum'),
+        )
+        
+        subtotals: Dict[str, List[ContractSubtotal]] = {}
+        for (client_key, contrat_number), row in zip(grouped.index, grouped.itertuples(index=False)):
+            subtotals.setdefault(client_key, []).append(ContractSubtotal(
+                contrat_number=contrat_number,
+                invoice_count=int(row.invoice_count),
+                total_ht=Decimal(row.total_ht),
+                total_tva=Decimal(row.total_tva),
+                total_ttc=Decimal(row.total_ttc)
+            ))
+        
+        return subtotals
+    
+    def group_by_client(
+        self,
+        invoices: List[Invoice],
+        contract_subtotals: Optional[Dict[str, List[ContractSubtotal]]] = None
+    ) -> List[Client]:
+        """Groupe les factures par client
+        
+        Si les sous-totaux par contrat sont fournis, les totaux du client en sont
+        déduits au lieu d'être recalculés facture par facture.
+        """
         clients_dict: Dict[str, List[Invoice]] = {}
         
         # Grouper les factures par numéro de client
@@ -116,14 +157,20 @@ class InvoiceProcessor:
         
         # Créer les objets Client
         clients = []
-        for client_invoices in clients_dict.values():
+        for client_key, client_invoices in clients_dict.items():
             # Prendre l'adresse de la première facture pour le client
             client_number = client_invoices[0].client_number
             client_address = client_invoices[0].client_address
             
+            contracts = contract_subtotals.get(client_key, []) if contract_subtotals is not None else []
+            
             # Calculer les totaux
-            total_ht = sum(inv.amount_ht for inv in client_invoices)
-            total_tva = sum(inv.amount_tva for inv in client_invoices)
+            if contracts:
+                total_ht = sum((c.total_ht for c in contracts), Decimal('0.00'))
+                total_tva = sum((c.total_tva for c in contracts), Decimal('0.00'))
+            else:
+                total_ht = sum(inv.amount_ht for inv in client_invoices)
+                total_tva = sum(inv.amount_tva for inv in client_invoices)
             total_ttc = total_ht + total_tva
             
             client = Client(
@@ -132,7 +179,8 @@ class InvoiceProcessor:
                 invoices=client_invoices,
                 total_ht=total_ht,
                 total_tva=total_tva,
-                total_ttc=total_ttc
+                total_ttc=total_ttc,
+                contracts=contracts
             )
             clients.append(client)
         
@@ -141,13 +189,16 @@ class InvoiceProcessor:
         
         return clients
     
-    def get_summary_dataframe(self, clients: List[Client]) -> pd.DataFrame:
+    def get_summary_dataframe(self, clients: List[Client]) -> "pd.DataFrame":
         """Crée un DataFrame résumé pour affichage"""
+        import pandas as pd
+        
         data = []
         for client in clients:
             data.append({
                 'Client': client.number,
                 'Nb Factures': len(client.invoices),
+                'Nb Contrats': len(client.contracts),
                 'Total HT ': f"{client.total_ht:.2f}",
                 'Total TVA ': f"{client.total_tva:.2f}",
                 'Total TTC ': f"{client.total_ttc:.2f}"
@@ -0,0 +1,260 @@
+"""Test de charge des chemins de traitement et de téléchargement de l'application
+
+Simule des sessions utilisateur concurrentes. Chaque session reproduit ce que
+fait main.main après un upload : process_excel_file sur un classeur Excel
+synthétique, puis create_zip_archive pour le téléchargement groupé.
+
+Deux modes :
+    thread   sessions dans des threads d'un même processus, comme les sessions
+             Streamlit qui partagent le serveur
+    process  sessions réparties sur un pool de processus
+
+Les latences sont toujours mesurées sans traçage mémoire. La mémoire par session
+est mesurée à part, après la phase chronométrée : quelques sessions sont rejouées
+une à une sous tracemalloc dans un processus neuf (--memory-samples), et leurs
+durées sont ignorées.
+
+Utilisation :
+    python load_test.py --concurrency 8 --sessions 32 --clients 50 --invoices-per-client 40
+    python load_test.py --mode process --concurrency 4 --json resultats.json
+"""
+import argparse
+import json
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def build_workbook(clients: int, invoices_per_client: int, contracts_per_client: int) -> bytes:
+    """Génère un classeur Excel au format attendu par InvoiceProcessor"""
+    import pandas as pd
+
+    rows = []
+    for c in range(clients):
+        client_number = f"C{c:05d}"
+        for i in range(invoices_per_client):
+            rows.append({
+                'Numéro_client': client_number,
+                'addresse_client': f"{c} Rue de l'Industrie, Agadir",
+                'Numéro_contrat': f"{client_number}-{i % contracts_per_client:03d}",
+                'Numéro_facture': f"F{c:05d}-{i:05d}",
+                'montant_ht': round(100 + (i * 7.31) % 900, 2),
+                'montant_tva': round((100 + (i * 7.31) % 900) * 0.2, 2),
+                'date': '2024-01-15',
+            })
+
+    buffer = BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
+def run_session(workbook: bytes, chunk_size: Optional[int], skip_zip: bool) -> Dict[str, Any]:
+    """Exécute une session : traitement du fichier puis archive ZIP"""
+    from invoice_processor import InvoiceProcessor
+    from models import Company
+    from pdf_generator import PDFGenerator
+    from utils import create_zip_archive
+
+    started = time.perf_counter()
+    success, clients, message = InvoiceProcessor().process_excel_file(BytesIO(workbook))
+    processed = time.perf_counter()
+    if not success:
+        raise RuntimeError(message)
+
+    zip_size = 0
+    if not skip_zip:
+        zip_buffer = create_zip_archive(clients, PDFGenerator(Company(), chunk_size=chunk_size))
+        zip_size = len(zip_buffer.getvalue())
+    finished = time.perf_counter()
+
+    return {
+        'process_seconds': processed - started,
+        'zip_seconds': finished - processed,
+        'total_seconds': finished - started,
+        'clients': len(clients),
+        'invoices': sum(len(client.invoices) for client in clients),
+        'zip_bytes': zip_size,
+    }
+
+
+def measure_session_memory(workbook: bytes, chunk_size: Optional[int], skip_zip: bool, samples: int) -> List[int]:
+    """Rejoue des sessions sous tracemalloc et retourne leur pic mémoire (octets)
+
+    Les durées de ces sessions sont faussées par le traçage et ne sont pas utilisées.
+    """
+    # Premier passage non tracé : les imports ne sont pas comptés dans la session
+    run_session(workbook, chunk_size, skip_zip=True)
+
+    peaks = []
+    for _ in range(samples):
+        tracemalloc.start()
+        try:
+            run_session(workbook, chunk_size, skip_zip)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peaks
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile par interpolation linéaire"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def max_rss_bytes() -> int:
+    """Pic de mémoire résidente du processus courant"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def run_load_test(args) -> Dict[str, Any]:
+    """Lance les sessions concurrentes et agrège les mesures"""
+    workbook = build_workbook(args.clients, args.invoices_per_client, args.contracts_per_client)
+    executor_class = ProcessPoolExecutor if args.mode == 'process' else ThreadPoolExecutor
+
+    results = []
+    errors = []
+
+    started = time.perf_counter()
+    with executor_class(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_session, workbook, args.chunk_size, args.skip_zip)
+            for _ in range(args.sessions)
+        ]
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(str(e))
+            else:
+                results.append(result)
+    elapsed = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        'mode': args.mode,
+        'concurrency': args.concurrency,
+        'sessions': args.sessions,
+        'workbook': {
+            'clients': args.clients,
+            'invoices_per_client': args.invoices_per_client,
+            'contracts_per_client': args.contracts_per_client,
+            'size_bytes': len(workbook),
+        },
+        'elapsed_seconds': elapsed,
+        'succeeded': len(results),
+        'failed': len(errors),
+        'errors': errors[:5],
+        'sessions_per_second': len(results) / elapsed if elapsed else 0.0,
+        'invoices_per_second': sum(r['invoices'] for r in results) / elapsed if elapsed else 0.0,
+        'latency_seconds': {},
+    }
+
+    if results:
+        for stage in ('process_seconds', 'zip_seconds', 'total_seconds'):
+            values = [r[stage] for r in results]
+            report['latency_seconds'][stage.replace('_seconds', '')] = {
+                **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES},
+                'mean': statistics.mean(values),
+                'max': max(values),
+            }
+
+    if args.mode == 'thread':
+        # Pic global du processus : ne redescend jamais et inclut la génération du classeur
+        report['process_max_rss_bytes'] = max_rss_bytes()
+
+    # Mémoire par session : passage séparé, hors chronométrage
+    report['memory_per_session_bytes'] = None
+    if args.memory_samples > 0 and results:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            peaks = executor.submit(
+                measure_session_memory, workbook, args.chunk_size, args.skip_zip, args.memory_samples
+            ).result()
+        report['memory_per_session_bytes'] = {
+            'samples': len(peaks),
+            'mean': statistics.mean(peaks),
+            'max': max(peaks),
+        }
+
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    """Affiche le rapport sous forme lisible"""
+    workbook = report['workbook']
+    print(f"Mode {report['mode']} - {report['concurrency']} sessions concurrentes, {report['sessions']} au total")
+    print(f"Classeur : {workbook['clients']} clients x {workbook['invoices_per_client']} factures "
+          f"({workbook['contracts_per_client']} contrat(s) par client, {workbook['size_bytes'] / 1024:.0f} Ko)")
+    print(f"Durée : {report['elapsed_seconds']:.2f} s - {report['succeeded']} réussie(s), {report['failed']} échec(s)")
+    print(f"Débit : {report['sessions_per_second']:.2f} sessions/s, {report['invoices_per_second']:.0f} factures/s")
+
+    if report['latency_seconds']:
+        print()
+        header = f"{'Étape':<10}" + ''.join(f"{'p' + str(pct):>10}" for pct in PERCENTILES) + f"{'moy.':>10}{'max':>10}"
+        print(header)
+        print('-' * len(header))
+        for stage, stats in report['latency_seconds'].items():
+            line = f"{stage:<10}" + ''.join(f"{stats['p' + str(pct)]:>10.3f}" for pct in PERCENTILES)
+            print(line + f"{stats['mean']:>10.3f}{stats['max']:>10.3f}")
+        print("(latences en secondes)")
+
+    print()
+    memory = report['memory_per_session_bytes']
+    if memory is not None:
+        print(f"Mémoire par session (pic tracemalloc, {memory['samples']} session(s) rejouée(s) hors chronométrage) : "
+              f"moy. {memory['mean'] / 1e6:.1f} Mo, max {memory['max'] / 1e6:.1f} Mo")
+    else:
+        print("Mémoire par session : non mesurée (--memory-samples 0)")
+    if 'process_max_rss_bytes' in report:
+        print(f"Pic RSS du processus partagé (toutes sessions et classeur compris) : "
+              f"{report['process_max_rss_bytes'] / 1e6:.1f} Mo")
+
+    for error in report['errors']:
+        print(f"Erreur : {error}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge du traitement et du téléchargement des factures")
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                        help='Sessions dans des threads (comme Streamlit) ou des processus séparés')
+    parser.add_argument('--concurrency', type=int, default=4, help='Nombre de sessions simultanées')
+    parser.add_argument('--sessions', type=int, default=None, help='Nombre total de sessions (par défaut : 2 x concurrence)')
+    parser.add_argument('--clients', type=int, default=20, help='Clients par classeur')
+    parser.add_argument('--invoices-per-client', type=int, default=25, help='Factures par client')
+    parser.add_argument('--contracts-per-client', type=int, default=3, help='Contrats par client')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Taille des blocs de rendu PDF')
+    parser.add_argument('--memory-samples', type=int, default=1,
+                        help='Sessions rejouées sous tracemalloc pour mesurer la mémoire par session (0 : aucune)')
+    parser.add_argument('--skip-zip', action='store_true', help="Ne mesurer que le traitement du fichier Excel")
+    parser.add_argument('--json', dest='json_path', default=None, help='Écrire le rapport JSON dans ce fichier')
+    args = parser.parse_args(argv)
+
+    if args.sessions is None:
+        args.sessions = args.concurrency * 2
+    args.contracts_per_client = max(args.contracts_per_client, 1)
+
+    report = run_load_test(args)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
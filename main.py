@@ -1,10 +1,7 @@
 import streamlit as st
-import pandas as pd
 from invoice_processor import InvoiceProcessor
-from pdf_generator import PDFGenerator
 from models import Company
-from utils import create_download_button, validate_upload, show_sample_format
-import os
+from utils import create_download_button, validate_upload, show_sample_format, show_render_profiles
 
 # Configuration de la page
 st.set_page_config(
@@ -90,7 +87,6 @@ def main():
     # Initialisation
     processor = InvoiceProcessor()
     company = Company()
-    pdf_generator = PDFGenerator(company)
     
     # Sidebar pour les paramètres
     with st.sidebar:
@@ -103,6 +99,22 @@ def main():
             company.phone = st.text_input("Téléphone", value=company.phone)
             company.email = st.text_input("Email", value=company.email)
         
+        # Profilage du rendu PDF
+        with st.expander("⏱️ Profilage du rendu", expanded=False):
+            profile_rendering = st.checkbox(
+                "Mesurer le coût de rendu par client",
+                value=False,
+                help="Enregistre les temps de construction et de rendu, les pages et la taille de chaque PDF"
+            )
+            profile_top_n = st.number_input(
+                "Détail cProfile pour les N clients les plus lents",
+                min_value=0,
+                max_value=50,
+                value=5,
+                disabled=not profile_rendering,
+                help="Ces clients sont rendus une seconde fois sous cProfile ; les durées affichées restent celles du rendu normal"
+            )
+        
         # Aide et documentation
         st.markdown("---")
         st.header("📚 Aide")
@@ -192,6 +204,8 @@ def main():
                                 st.write(f"TTC : {client.total_ttc:.2f} ")
                             
                             with col_invoices:
+                                import pandas as pd
+                                
                                 invoice_data = []
                                 for inv in client.invoices:
                                     invoice_data.append({
@@ -202,11 +216,36 @@ def main():
                                     })
                                 
                                 st.dataframe(pd.DataFrame(invoice_data), use_container_width=True)
+                                
+                                if len(client.contracts) > 1:
+                                    st.write("**Sous-totaux par contrat :**")
+                                    contract_data = [{
+                                        'N° Contrat': contract.contrat_number,
+                                        'Factures': contract.invoice_count,
+                                        'HT ': f"{contract.total_ht:.2f}",
+                                        'TVA ': f"{contract.total_tva:.2f}",
+                                        'TTC ': f"{contract.total_ttc:.2f}"
+                                    } for contract in client.contracts]
+                                    
+                                    st.dataframe(pd.DataFrame(contract_data), use_container_width=True)
                     
                     # Section de téléchargement
                     st.markdown("---")
                     st.header("📥 Téléchargement des factures")
+                    
+                    # Import différé : reportlab n'est chargé que lorsqu'un PDF est demandé
+                    from pdf_generator import PDFGenerator
+                    pdf_generator = PDFGenerator(
+                        company,
+                        chunk_size=500,
+                        profile=profile_rendering,
+                        profile_top_n=int(profile_top_n)
+                    )
                     create_download_button(clients, pdf_generator)
+                    
+                    if profile_rendering:
+                        st.markdown("---")
+                        show_render_profiles(pdf_generator)
                 
                 else:
                     # Message d'erreur
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 from decimal import Decimal
 
@@ -15,6 +15,16 @@ class Invoice:
     date: Optional[str] = None
     
 
+@dataclass
+class ContractSubtotal:
+    """Sous-totaux précalculés d'un contrat pour un client"""
+    contrat_number: str
+    invoice_count: int
+    total_ht: Decimal
+    total_tva: Decimal
+    total_ttc: Decimal
+    
+
 @dataclass
 class Client:
     """Représente un client avec ses factures groupées"""
@@ -24,6 +34,7 @@ class Client:
     total_ht: Decimal
     total_tva: Decimal
     total_ttc: Decimal
+    contracts: List[ContractSubtotal] = field(default_factory=list)
 
 @dataclass
 class Company:
@@ -32,4 +43,19 @@ class Company:
     address: str = "Rue 18 Novembre Quartier Industriel AGADIR"
     phone: str = "05 28 82 96 00 "
     email: str = "Contact@srm-sm.ma"
-    logo_path: str = "assets/logo.jpg"
\ No newline at end of file
+    logo_path: str = "assets/logo.jpg"
+
+
+@dataclass
+class RenderProfile:
+    """Coût de génération du PDF d'un client (mode profilage)"""
+    client_number: str
+    invoice_count: int
+    # Construction des éléments, y compris les blocs du tableau produits pendant doc.build
+    story_seconds: float
+    # Mise en page et écriture du PDF, hors construction des blocs
+    build_seconds: float
+    total_seconds: float
+    page_count: int
+    output_bytes: int
+    cprofile_stats: Optional[str] = None
@@ -1,22 +1,92 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+import cProfile
+import csv
+import heapq
+import json
 import os
+import pstats
+import time
+from dataclasses import asdict
 from datetime import datetime
-from models import Client, Company
-from io import BytesIO
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import Client, Company, ContractSubtotal, Invoice, RenderProfile
+from io import BytesIO, StringIO
+
+INVOICE_TABLE_COL_WIDTHS = [30*mm,30*mm,30*mm, 30*mm, 25*mm, 30*mm]
+
+
+class LazyTableChunks(Flowable):
+    """Flowable qui matérialise les tableaux un par un depuis un générateur
+    
+    Chaque fois que le document tente de placer ce flowable, il est découpé en
+    tableau suivant + reste, si bien qu'un seul bloc de lignes est en mémoire à la fois.
+    """
+    
+    def __init__(self, chunks: Iterator[Flowable], pending: Optional[Flowable] = None):
+        super().__init__()
+        self.chunks = chunks
+        self.pending = pending if pending is not None else next(chunks, None)
+    
+    def wrap(self, availWidth, availHeight):
+        if self.pending is None:
+            return 0, 0
+        # Hauteur volontairement trop grande pour forcer un appel à split()
+        return availWidth, availHeight + 1
+    
+    def split(self, availWidth, availHeight):
+        if self.pending is None:
+            return []
+        following = next(self.chunks, None)
+        # Le premier élément doit tenir tel quel dans le cadre courant
+        parts = [Spacer(0, 0), self.pending]
+        if following is not None:
+            parts.append(LazyTableChunks(self.chunks, following))
+        return parts
+    
+    def draw(self):
+        pass
+
 
 class PDFGenerator:
     """Génère des factures PDF à partir des données client"""
     
-    def __init__(self, company: Company):
+    def __init__(
+        self,
+        company: Company,
+        chunk_size: Optional[int] = None,
+        profile: bool = False,
+        profile_top_n: int = 0
+    ):
         self.company = company
+        # Au-delà de chunk_size factures, le tableau est rendu par blocs
+        self.chunk_size = chunk_size
+        # Profilage : temps, pages et taille par client ; statistiques cProfile
+        # conservées pour les profile_top_n clients les plus lents
+        self.profile = profile
+        self.profile_top_n = profile_top_n
+        self.profiles: Dict[str, RenderProfile] = {}
+        # Tas min (durée, client) des clients dont les statistiques cProfile sont conservées
+        self.profiled_heap: List[Tuple[float, str]] = []
+        # Temps de construction des blocs du tableau pendant le rendu en cours
+        self.chunk_seconds = 0.0
+        # Contenu du logo gardé en mémoire (voir preload_logo)
+        self.logo_data: Optional[bytes] = None
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
     
+    def preload_logo(self):
+        """Charge le logo en mémoire pour éviter une lecture disque à chaque PDF"""
+        if os.path.exists(self.company.logo_path):
+            with open(self.company.logo_path, 'rb') as logo_file:
+                self.logo_data = logo_file.read()
+    
     def setup_custom_styles(self):
         """Configure les styles personnalisés"""
         self.styles.add(ParagraphStyle(
@@ -47,16 +117,66 @@ class PDFGenerator:
     
     def generate_pdf(self, client: Client) -> BytesIO:
         """Génère le PDF pour un client"""
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
+        buffer, page_count, story_seconds, build_seconds = self.render_document(client)
+        
+        if self.profile:
+            self.record_profile(client, RenderProfile(
+                client_number=client.number,
+                invoice_count=len(client.invoices),
+                story_seconds=story_seconds,
+                build_seconds=build_seconds,
+                total_seconds=story_seconds + build_seconds,
+                page_count=page_count,
+                output_bytes=buffer.getbuffer().nbytes
+            ))
+        
+        return buffer
+    
+    def render_document(
+        self,
+        client: Client,
+        profiler: Optional[cProfile.Profile] = None
+    ) -> Tuple[BytesIO, int, float, float]:
+        """Rend le PDF et retourne (buffer, pages, durée de construction, durée de rendu)"""
+        if profiler is not None:
+            profiler.enable()
+        try:
+            self.chunk_seconds = 0.0
+            started = time.perf_counter()
+            
+            buffer = BytesIO()
+            doc = SimpleDocTemplate(
+                buffer,
+                pagesize=A4,
+                rightMargin=20*mm,
+                leftMargin=20*mm,
+                topMargin=20*mm,
+                bottomMargin=20*mm
+            )
+            
+            story = self.build_story(client)
+            story_done = time.perf_counter()
+            chunks_in_story = self.chunk_seconds
+            
+            doc.build(story)
+            finished = time.perf_counter()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        
+        # Les blocs du tableau construits pendant doc.build relèvent de la construction
+        chunks_in_build = self.chunk_seconds - chunks_in_story
+        
+        buffer.seek(0)
+        return (
             buffer,
-            pagesize=A4,
-            rightMargin=20*mm,
-            leftMargin=20*mm,
-            topMargin=20*mm,
-            bottomMargin=20*mm
+            doc.page,
+            story_done - started + chunks_in_build,
+            finished - story_done - chunks_in_build
         )
-        
+    
+    def build_story(self, client: Client) -> list:
+        """Construit la liste des éléments du PDF d'un client"""
         story = []
         
         # En-tête avec logo et informations de l'entreprise
@@ -79,9 +199,56 @@ class PDFGenerator:
         # Pied de page
         self.add_footer(story) 
         
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return story
+    
+    def record_profile(self, client: Client, profile: RenderProfile):
+        """Enregistre le profil d'un client (le dernier rendu remplace le précédent)
+        
+        Les durées enregistrées viennent du rendu non profilé. Si le client entre
+        dans les profile_top_n plus lents, il est rendu une seconde fois sous
+        cProfile uniquement pour capturer les statistiques.
+        """
+        self.profiles[client.number] = profile
+        if self.profile_top_n <= 0:
+            return
+        
+        # Un nouveau rendu du même client remplace son entrée dans le tas
+        if any(number == client.number for _, number in self.profiled_heap):
+            self.profiled_heap = [entry for entry in self.profiled_heap if entry[1] != client.number]
+            heapq.heapify(self.profiled_heap)
+        
+        if len(self.profiled_heap) >= self.profile_top_n and profile.total_seconds <= self.profiled_heap[0][0]:
+            return
+        
+        profiler = cProfile.Profile()
+        self.render_document(client, profiler)
+        stream = StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(25)
+        profile.cprofile_stats = stream.getvalue()
+        
+        heapq.heappush(self.profiled_heap, (profile.total_seconds, client.number))
+        if len(self.profiled_heap) > self.profile_top_n:
+            _, evicted = heapq.heappop(self.profiled_heap)
+            self.profiles[evicted].cprofile_stats = None
+    
+    def slowest_profiles(self, limit: Optional[int] = None) -> List[RenderProfile]:
+        """Retourne les profils triés du plus lent au plus rapide"""
+        ordered = sorted(self.profiles.values(), key=lambda p: p.total_seconds, reverse=True)
+        return ordered if limit is None else ordered[:limit]
+    
+    def profiles_to_csv(self) -> str:
+        """Exporte les profils en CSV (sans les statistiques cProfile)"""
+        fields = [name for name in RenderProfile.__dataclass_fields__ if name != 'cprofile_stats']
+        stream = StringIO()
+        writer = csv.DictWriter(stream, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for profile in self.slowest_profiles():
+            writer.writerow(asdict(profile))
+        return stream.getvalue()
+    
+    def profiles_to_json(self) -> str:
+        """Exporte les profils en JSON, statistiques cProfile comprises"""
+        return json.dumps([asdict(p) for p in self.slowest_profiles()], ensure_ascii=False, indent=2)
     
     def add_header(self, story):
         """Ajoute l'en-tête avec logo et infos entreprise"""
@@ -96,9 +263,10 @@ class PDFGenerator:
         Email: {self.company.email}
         """
         
-        if os.path.exists(self.company.logo_path):
+        if self.logo_data is not None or os.path.exists(self.company.logo_path):
             try:
-                logo = Image(self.company.logo_path, width=40*mm, height=40*mm)
+                logo_source = BytesIO(self.logo_data) if self.logo_data is not None else self.company.logo_path
+                logo = Image(logo_source, width=40*mm, height=40*mm)
                 header_data.append([logo, Paragraph(company_info, self.styles['CompanyInfo'])])
             except:
                 header_data.append(['', Paragraph(company_info, self.styles['CompanyInfo'])])
@@ -136,28 +304,104 @@ class PDFGenerator:
     
     def add_invoice_table(self, story, client: Client):
         """Ajoute le tableau des factures"""
-        # En-têtes du tableau
-        headers = ['N° client','N° Facture','N° contrat', 'Montant HT', 'TVA ', 'TTC ']
+        if self.chunk_size and len(client.invoices) > self.chunk_size:
+            story.append(LazyTableChunks(self.iter_invoice_table_chunks(client)))
+            story.append(Spacer(1, 20))
+            return
         
         # Données du tableau
-        table_data = [headers]
-        
-        for invoice in client.invoices:
-            row = [
-                client.number,                      
-                invoice.invoice_number,             
-                invoice.contrat_number,
-                f"{invoice.amount_ht:.2f}",
-                f"{invoice.amount_tva:.2f}",
-                f"{invoice.amount_ttc:.2f}"
-            ]
+        table_data = [self.invoice_table_headers()]
+        subtotal_rows = []
+        
+        for row, invoice in self.iter_invoice_rows(client):
+            if invoice is None:
+                subtotal_rows.append(len(table_data))
             table_data.append(row)
         
         # Créer le tableau
-        table = Table(table_data, colWidths=[30*mm,30*mm,30*mm, 30*mm, 25*mm, 30*mm])
+        table = Table(table_data, colWidths=INVOICE_TABLE_COL_WIDTHS)
+        table.setStyle(self.invoice_table_style(subtotal_rows))
+        
+        story.append(table)
+        story.append(Spacer(1, 20))
+    
+    def iter_invoice_table_chunks(self, client: Client) -> Iterator[Table]:
+        """Produit le tableau des factures par blocs de chunk_size lignes
+        
+        Chaque bloc répète l'en-tête ; les cumuls HT/TVA/TTC sont reportés d'un
+        bloc à l'autre (lignes « Report » et « À reporter »).
+        """
+        # Temps passé à construire les blocs, cumulé dans chunk_seconds : le
+        # générateur est consommé pendant doc.build (voir render_document)
+        resumed = time.perf_counter()
+        rows = self.iter_invoice_rows(client)
+        running = [Decimal('0.00'), Decimal('0.00'), Decimal('0.00')]
+        first_chunk = True
         
-        # Style du tableau
-        table.setStyle(TableStyle([
+        pending = list(islice(rows, self.chunk_size))
+        while pending:
+            following = list(islice(rows, self.chunk_size))
+            
+            table_data = [self.invoice_table_headers()]
+            subtotal_rows = []
+            carry_rows = []
+            
+            if not first_chunk:
+                carry_rows.append(len(table_data))
+                table_data.append(self.carry_row("Report", running))
+            
+            for row, invoice in pending:
+                if invoice is None:
+                    subtotal_rows.append(len(table_data))
+                else:
+                    running[0] += invoice.amount_ht
+                    running[1] += invoice.amount_tva
+                    running[2] += invoice.amount_ttc
+                table_data.append(row)
+            
+            if following:
+                carry_rows.append(len(table_data))
+                table_data.append(self.carry_row("À reporter", running))
+            
+            table = Table(table_data, colWidths=INVOICE_TABLE_COL_WIDTHS, repeatRows=1)
+            table.setStyle(self.invoice_table_style(subtotal_rows, carry_rows))
+            self.chunk_seconds += time.perf_counter() - resumed
+            yield table
+            resumed = time.perf_counter()
+            
+            first_chunk = False
+            pending = following
+        
+        self.chunk_seconds += time.perf_counter() - resumed
+    
+    def iter_invoice_rows(self, client: Client) -> Iterator[Tuple[list, Optional[Invoice]]]:
+        """Produit les lignes du tableau avec la facture associée (None pour un sous-total)"""
+        if len(client.contracts) > 1:
+            # Factures regroupées par contrat, suivies du sous-total précalculé
+            invoices_by_contract = {}
+            for invoice in client.invoices:
+                invoices_by_contract.setdefault(invoice.contrat_number, []).append(invoice)
+            
+            for contract in client.contracts:
+                for invoice in invoices_by_contract.pop(contract.contrat_number, []):
+                    yield self.invoice_row(client, invoice), invoice
+                yield self.contract_subtotal_row(contract), None
+
+            # Factures sans sous-total correspondant : affichées quand même
+            for contract_invoices in invoices_by_contract.values():
+                for invoice in contract_invoices:
+                    yield self.invoice_row(client, invoice), invoice
+        else:
+            for invoice in client.invoices:
+                yield self.invoice_row(client, invoice), invoice
+    
+    def invoice_table_headers(self) -> list:
+        """En-têtes du tableau des factures"""
+        return ['N° client','N° Facture','N° contrat', 'Montant HT', 'TVA ', 'TTC ']
+    
+    def invoice_table_style(self, subtotal_rows: List[int], carry_rows: Optional[List[int]] = None) -> TableStyle:
+        """Construit le style du tableau des factures"""
+        style_commands = [
             # En-tête
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -178,10 +422,60 @@ class PDFGenerator:
             
             # Alternance de couleurs
             ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
-        ]))
+        ]
         
-        story.append(table)
-        story.append(Spacer(1, 20))
+        # Sous-totaux par contrat
+        for row in subtotal_rows:
+            style_commands.extend([
+                ('BACKGROUND', (0, row), (-1, row), colors.HexColor('#d6e4f0')),
+                ('FONTNAME', (0, row), (-1, row), 'Helvetica-Bold'),
+                ('SPAN', (0, row), (2, row)),
+                ('ALIGN', (0, row), (2, row), 'LEFT'),
+            ])
+        
+        # Cumuls reportés entre blocs
+        for row in carry_rows or []:
+            style_commands.extend([
+                ('BACKGROUND', (0, row), (-1, row), colors.HexColor('#eeeeee')),
+                ('FONTNAME', (0, row), (-1, row), 'Helvetica-BoldOblique'),
+                ('SPAN', (0, row), (2, row)),
+                ('ALIGN', (0, row), (2, row), 'LEFT'),
+            ])
+        
+        return TableStyle(style_commands)
+    
+    def invoice_row(self, client: Client, invoice: Invoice) -> list:
+        """Construit la ligne du tableau pour une facture"""
+        return [
+            client.number,                      
+            invoice.invoice_number,             
+            invoice.contrat_number,
+            f"{invoice.amount_ht:.2f}",
+            f"{invoice.amount_tva:.2f}",
+            f"{invoice.amount_ttc:.2f}"
+        ]
+    
+    def contract_subtotal_row(self, contract: ContractSubtotal) -> list:
+        """Construit la ligne de sous-total d'un contrat"""
+        return [
+            f"Sous-total contrat {contract.contrat_number} ({contract.invoice_count} facture(s))",
+            '',
+            '',
+            f"{contract.total_ht:.2f}",
+            f"{contract.total_tva:.2f}",
+            f"{contract.total_ttc:.2f}"
+        ]
+    
+    def carry_row(self, label: str, running: List[Decimal]) -> list:
+        """Construit une ligne de cumul reporté entre deux blocs"""
+        return [
+            label,
+            '',
+            '',
+            f"{running[0]:.2f}",
+            f"{running[1]:.2f}",
+            f"{running[2]:.2f}"
+        ]
     
     def add_totals(self, story, client: Client):
         """Ajoute les totaux"""
@@ -0,0 +1,472 @@
+"""Service local de génération de factures PDF
+
+Expose PDFGenerator via une API HTTP locale, indépendante de Streamlit :
+
+    POST /render   corps JSON {"client": {...}} ou {"snapshot": "nom.json"}
+                   -> application/pdf
+    GET  /metrics  -> débit, profondeur de file, latences (JSON)
+    GET  /health   -> {"status": "ok"}
+
+Les rendus sont exécutés par un pool de processus démarré au lancement, chaque
+processus gardant ses styles et son logo chargés. La file d'attente est bornée :
+au-delà de ``max_queue`` requêtes en cours, le service répond 503 avec Retry-After.
+
+Utilisation :
+    python render_service.py --port 8765 --workers 4 --max-queue 16
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from decimal import Decimal, InvalidOperation
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from models import Client, Company, ContractSubtotal, Invoice
+
+# Fenêtre glissante (secondes) pour le calcul du débit récent
+THROUGHPUT_WINDOW = 60.0
+
+# Générateur propre à chaque processus du pool, créé par _init_worker
+_worker_generator = None
+
+
+class PayloadError(ValueError):
+    """Données client invalides dans une requête de rendu"""
+
+
+def _init_worker(company_data: Dict[str, str], chunk_size: Optional[int]):
+    """Prépare un processus du pool : styles et logo chargés une seule fois"""
+    global _worker_generator
+    from pdf_generator import PDFGenerator
+
+    _worker_generator = PDFGenerator(Company(**company_data), chunk_size=chunk_size)
+    _worker_generator.preload_logo()
+
+
+def _render_in_worker(client_data: Dict[str, Any]) -> bytes:
+    """Génère le PDF d'un client dans un processus du pool"""
+    client = client_from_payload(client_data)
+    return _worker_generator.generate_pdf(client).getvalue()
+
+
+def _warm_up(_index: int) -> int:
+    """Tâche vide permettant de vérifier que les processus sont prêts"""
+    return os.getpid()
+
+
+def _to_decimal(value, field_name: str) -> Decimal:
+    try:
+        amount = Decimal(str(value).replace(',', '.'))
+        if not amount.is_finite():
+            raise InvalidOperation
+        return amount.quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise PayloadError(f"Montant invalide pour '{field_name}' : {value!r}")
+
+
+def _check_amount(data: Dict[str, Any], field_name: str, expected: Decimal, label: str):
+    """Vérifie qu'un montant fourni dans la requête correspond au montant calculé"""
+    if field_name in data and _to_decimal(data[field_name], field_name) != expected:
+        raise PayloadError(f"{label} : '{field_name}' ne correspond pas aux montants HT/TVA ({expected})")
+
+
+def contract_subtotals_from_invoices(invoices: List[Invoice]) -> List[ContractSubtotal]:
+    """Calcule les sous-totaux par contrat, triés par numéro comme dans l'application"""
+    subtotals: Dict[str, ContractSubtotal] = {}
+    for invoice in invoices:
+        contract = subtotals.get(invoice.contrat_number)
+        if contract is None:
+            contract = subtotals[invoice.contrat_number] = ContractSubtotal(
+                contrat_number=invoice.contrat_number,
+                invoice_count=0,
+                total_ht=Decimal('0.00'),
+                total_tva=Decimal('0.00'),
+                total_ttc=Decimal('0.00')
+            )
+        contract.invoice_count += 1
+        contract.total_ht += invoice.amount_ht
+        contract.total_tva += invoice.amount_tva
+        contract.total_ttc += invoice.amount_ttc
+    return [subtotals[key] for key in sorted(subtotals)]
+
+
+def client_from_payload(data: Dict[str, Any]) -> Client:
+    """Construit un Client à partir de sa représentation JSON
+
+    Les montants peuvent être des nombres ou des chaînes. Le TTC des factures,
+    les totaux du client et les sous-totaux par contrat sont toujours calculés à
+    partir des montants HT/TVA ; s'ils sont fournis, ils doivent y correspondre.
+    """
+    if not isinstance(data, dict):
+        raise PayloadError("Le client doit être un objet JSON")
+    if 'number' not in data or not isinstance(data.get('invoices'), list):
+        raise PayloadError("Le client doit contenir 'number' et une liste 'invoices'")
+
+    number = str(data['number'])
+    address = str(data.get('address', ''))
+    invoices = []
+    for item in data['invoices']:
+        if not isinstance(item, dict):
+            raise PayloadError("Chaque facture doit être un objet JSON")
+        try:
+            amount_ht = _to_decimal(item['amount_ht'], 'amount_ht')
+            amount_tva = _to_decimal(item['amount_tva'], 'amount_tva')
+            _check_amount(item, 'amount_ttc', amount_ht + amount_tva, f"Facture {item['invoice_number']}")
+            invoice = Invoice(
+                invoice_number=str(item['invoice_number']),
+                client_number=number,
+                client_address=address,
+                contrat_number=str(item.get('contrat_number', '')),
+                amount_ht=amount_ht,
+                amount_tva=amount_tva,
+                amount_ttc=amount_ht + amount_tva,
+                date=item.get('date')
+            )
+        except KeyError:
+            raise PayloadError("Chaque facture doit contenir 'invoice_number', 'amount_ht' et 'amount_tva'")
+        invoices.append(invoice)
+
+    expected_contracts = contract_subtotals_from_invoices(invoices)
+    if 'contracts' in data:
+        if not isinstance(data['contracts'], list):
+            raise PayloadError("'contracts' doit être une liste")
+        contracts = []
+        for item in data['contracts']:
+            if not isinstance(item, dict):
+                raise PayloadError("Chaque sous-total de contrat doit être un objet JSON")
+            try:
+                contracts.append(ContractSubtotal(
+                    contrat_number=str(item['contrat_number']),
+                    invoice_count=int(item['invoice_count']),
+                    total_ht=_to_decimal(item['total_ht'], 'total_ht'),
+                    total_tva=_to_decimal(item['total_tva'], 'total_tva'),
+                    total_ttc=_to_decimal(item['total_ttc'], 'total_ttc')
+                ))
+            except (KeyError, TypeError, ValueError):
+                raise PayloadError("Sous-total de contrat incomplet")
+
+        by_number = {contract.contrat_number: contract for contract in contracts}
+        if len(by_number) != len(contracts) or by_number != {c.contrat_number: c for c in expected_contracts}:
+            raise PayloadError("Les sous-totaux par contrat ne correspondent pas aux factures")
+    else:
+        contracts = expected_contracts
+
+    total_ht = sum((inv.amount_ht for inv in invoices), Decimal('0.00'))
+    total_tva = sum((inv.amount_tva for inv in invoices), Decimal('0.00'))
+    total_ttc = total_ht + total_tva
+    _check_amount(data, 'total_ht', total_ht, f"Client {number}")
+    _check_amount(data, 'total_tva', total_tva, f"Client {number}")
+    _check_amount(data, 'total_ttc', total_ttc, f"Client {number}")
+
+    return Client(
+        number=number,
+        address=address,
+        invoices=invoices,
+        total_ht=total_ht,
+        total_tva=total_tva,
+        total_ttc=total_ttc,
+        contracts=contracts
+    )
+
+
+def client_to_payload(client: Client) -> Dict[str, Any]:
+    """Sérialise un Client en JSON (montants en chaînes pour conserver les décimales)"""
+    def convert(value):
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        return value
+
+    return convert(asdict(client))
+
+
+class RenderMetrics:
+    """Compteurs du service, partagés entre les threads HTTP"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.bytes_rendered = 0
+        self.total_latency = 0.0
+        self.recent = deque()
+
+    def record_submitted(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def record_task_done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def record_end(self, latency: float, size: int = 0, success: bool = True):
+        with self.lock:
+            if success:
+                self.completed += 1
+                self.bytes_rendered += size
+                self.total_latency += latency
+                self.recent.append(time.monotonic())
+            else:
+                self.failed += 1
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    def snapshot(self, workers: int, max_queue: int) -> Dict[str, Any]:
+        """Retourne l'état courant des compteurs"""
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] > THROUGHPUT_WINDOW:
+                self.recent.popleft()
+            uptime = now - self.started_at
+            window = min(uptime, THROUGHPUT_WINDOW) or 1.0
+            return {
+                'workers': workers,
+                'max_queue': max_queue,
+                'in_flight': self.in_flight,
+                'queue_depth': max(0, self.in_flight - workers),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'bytes_rendered': self.bytes_rendered,
+                'uptime_seconds': round(uptime, 3),
+                'throughput_per_second': round(len(self.recent) / window, 3),
+                'average_latency_ms': round(1000 * self.total_latency / self.completed, 3) if self.completed else None,
+            }
+
+
+class RenderService:
+    """Serveur HTTP local adossé à un pool de processus de rendu"""
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        company: Optional[Company] = None,
+        chunk_size: Optional[int] = 500,
+        snapshot_dir: Optional[str] = None,
+        render_timeout: float = 300.0
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.workers * 4
+        self.company = company or Company()
+        self.chunk_size = chunk_size
+        self.snapshot_dir = os.path.abspath(snapshot_dir) if snapshot_dir else None
+        self.render_timeout = render_timeout
+        self.metrics = RenderMetrics()
+        self.slots = threading.BoundedSemaphore(self.max_queue)
+        self.pool = None
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        """(hôte, port) effectivement utilisés (utile avec port=0)"""
+        return self.server.server_address[:2]
+
+    def start_pool(self):
+        """Démarre les processus de rendu et attend qu'ils soient prêts"""
+        self.pool = multiprocessing.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(asdict(self.company), self.chunk_size)
+        )
+        self.pool.map(_warm_up, range(self.workers))
+
+    def start(self):
+        """Démarre le pool et le serveur HTTP dans un thread d'arrière-plan"""
+        self.start_pool()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        """Démarre le pool et sert les requêtes dans le thread courant"""
+        self.start_pool()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Arrête le serveur HTTP et le pool de processus"""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def load_snapshot(self, name: str) -> Dict[str, Any]:
+        """Lit un client sérialisé depuis le répertoire de snapshots"""
+        if self.snapshot_dir is None:
+            raise PayloadError("Aucun répertoire de snapshots configuré")
+        path = os.path.abspath(os.path.join(self.snapshot_dir, name))
+        if os.path.dirname(path) != self.snapshot_dir:
+            raise PayloadError(f"Snapshot invalide : {name!r}")
+        try:
+            with open(path, 'r', encoding='utf-8') as snapshot_file:
+                data = json.load(snapshot_file)
+        except FileNotFoundError:
+            raise PayloadError(f"Snapshot introuvable : {name!r}")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise PayloadError(f"Snapshot illisible : {e}")
+        except (ValueError, OSError) as e:
+            # Nom contenant un octet nul, répertoire, droits insuffisants...
+            raise PayloadError(f"Snapshot invalide : {name!r} ({e})")
+        return data.get('client', data) if isinstance(data, dict) else data
+
+    def submit(self, client_data: Dict[str, Any]):
+        """Valide le client puis délègue le rendu au pool
+
+        L'appelant doit avoir réservé une place dans ``slots`` : elle n'est libérée
+        qu'à la fin de la tâche, même si la requête HTTP a expiré entre-temps.
+        """
+        client_from_payload(client_data)
+
+        def task_done(_result):
+            self.metrics.record_task_done()
+            self.slots.release()
+
+        self.metrics.record_submitted()
+        return self.pool.apply_async(
+            _render_in_worker,
+            (client_data,),
+            callback=task_done,
+            error_callback=task_done
+        )
+
+    def _make_handler(self):
+        service = self
+
+        class RenderRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self.send_json(200, {'status': 'ok'})
+                elif self.path == '/metrics':
+                    self.send_json(200, service.metrics.snapshot(service.workers, service.max_queue))
+                else:
+                    self.send_json(404, {'error': 'Ressource inconnue'})
+
+            def do_POST(self):
+                if self.path != '/render':
+                    self.send_json(404, {'error': 'Ressource inconnue'})
+                    return
+
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                except ValueError:
+                    self.send_json(400, {'error': 'En-tête Content-Length invalide'}, {'Connection': 'close'})
+                    self.close_connection = True
+                    return
+                raw_body = self.rfile.read(length)
+
+                # Contre-pression : file bornée
+                if not service.slots.acquire(blocking=False):
+                    service.metrics.record_rejected()
+                    self.send_json(503, {'error': "File d'attente pleine"}, {'Retry-After': '1'})
+                    return
+
+                started = time.perf_counter()
+                submitted = False
+                try:
+                    request = json.loads(raw_body or b'{}')
+                    if not isinstance(request, dict):
+                        raise PayloadError("Le corps de la requête doit être un objet JSON")
+                    if 'snapshot' in request:
+                        client_data = service.load_snapshot(str(request['snapshot']))
+                    elif 'client' in request:
+                        client_data = request['client']
+                    else:
+                        raise PayloadError("La requête doit contenir 'client' ou 'snapshot'")
+
+                    async_result = service.submit(client_data)
+                    submitted = True
+                    pdf_bytes = async_result.get(service.render_timeout)
+                except (PayloadError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                    service.metrics.record_end(time.perf_counter() - started, success=False)
+                    self.send_json(400, {'error': str(e)})
+                    return
+                except multiprocessing.TimeoutError:
+                    service.metrics.record_end(time.perf_counter() - started, success=False)
+                    self.send_json(504, {'error': 'Délai de rendu dépassé'})
+                    return
+                except Exception as e:
+                    service.metrics.record_end(time.perf_counter() - started, success=False)
+                    self.send_json(500, {'error': f"Erreur lors du rendu : {str(e)}"})
+                    return
+                finally:
+                    # Une tâche soumise libère sa place à la fin du rendu (voir submit)
+                    if not submitted:
+                        service.slots.release()
+
+                service.metrics.record_end(time.perf_counter() - started, len(pdf_bytes))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/pdf')
+                self.send_header('Content-Length', str(len(pdf_bytes)))
+                self.end_headers()
+                self.wfile.write(pdf_bytes)
+
+        return RenderRequestHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service local de génération de factures PDF")
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse d'écoute (locale par défaut)")
+    parser.add_argument('--port', type=int, default=8765, help="Port d'écoute")
+    parser.add_argument('--workers', type=int, default=None, help='Nombre de processus de rendu')
+    parser.add_argument('--max-queue', type=int, default=None, help='Nombre maximal de requêtes en cours')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Taille des blocs pour les gros clients')
+    parser.add_argument('--snapshot-dir', default=None, help='Répertoire des clients sérialisés (JSON)')
+    args = parser.parse_args(argv)
+
+    service = RenderService(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        chunk_size=args.chunk_size,
+        snapshot_dir=args.snapshot_dir
+    )
+    host, port = service.address
+    print(f"Démarrage du service de rendu sur http://{host}:{port} ({service.workers} processus, file max {service.max_queue})")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -13,9 +13,9 @@ def create_download_button(clients: List[Client], pdf_generator):
         pdf_buffer = pdf_generator.generate_pdf(client)
         
         st.download_button(
-            label=f"📄 Télécharger la facture de {client.name}",
+            label=f"📄 Télécharger la facture de {client.number}",
             data=pdf_buffer.getvalue(),
-            file_name=f"facture_globale_{client.name.replace(' ', '_')}.pdf",
+            file_name=f"facture_globale_{client.number.replace(' ', '_')}.pdf",
             mime="application/pdf",
             use_container_width=True
         )
@@ -57,7 +57,7 @@ def create_zip_archive(clients: List[Client], pdf_generator) -> BytesIO:
     with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
         for client in clients:
             pdf_buffer = pdf_generator.generate_pdf(client)
-            filename = f"facture_globale_{client.name.replace(' ', '_')}.pdf"
+            filename = f"facture_globale_{client.number.replace(' ', '_')}.pdf"
             zip_file.writestr(filename, pdf_buffer.getvalue())
     
     zip_buffer.seek(0)
@@ -107,4 +107,53 @@ def show_sample_format():
     
     st.write("**Exemple de données :**")
     import pandas as pd
-    st.dataframe(pd.DataFrame(sample_data), use_container_width=True)
\ No newline at end of file
+    st.dataframe(pd.DataFrame(sample_data), use_container_width=True)
+
+def show_render_profiles(pdf_generator, limit: int = 10):
+    """Affiche les clients dont le rendu PDF est le plus coûteux"""
+    st.subheader("⏱️ Coût de rendu par client")
+    
+    profiles = pdf_generator.slowest_profiles()
+    if not profiles:
+        st.info("Aucun PDF généré pour le moment")
+        return
+    
+    total_time = sum(p.total_seconds for p in profiles)
+    st.write(f"{len(profiles)} client(s) rendu(s) en {total_time:.2f} s")
+    
+    import pandas as pd
+    top_data = []
+    for profile in profiles[:limit]:
+        top_data.append({
+            'Client': profile.client_number,
+            'Factures': profile.invoice_count,
+            'Construction (s)': f"{profile.story_seconds:.3f}",
+            'Rendu (s)': f"{profile.build_seconds:.3f}",
+            'Total (s)': f"{profile.total_seconds:.3f}",
+            'Pages': profile.page_count,
+            'Taille (Ko)': f"{profile.output_bytes / 1024:.1f}"
+        })
+    st.dataframe(pd.DataFrame(top_data), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="Exporter les profils (CSV)",
+            data=pdf_generator.profiles_to_csv(),
+            file_name="profils_rendu.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            label="Exporter les profils (JSON)",
+            data=pdf_generator.profiles_to_json(),
+            file_name="profils_rendu.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    
+    for profile in profiles:
+        if profile.cprofile_stats:
+            with st.expander(f"cProfile - {profile.client_number} ({profile.total_seconds:.3f} s)"):
+                st.code(profile.cprofile_stats)